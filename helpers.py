@@ -2,9 +2,13 @@ import io
 import re
 import csv
 import collections
-from typing import Any
+from itertools import chain
+from typing import Any, Callable, Iterable, Iterator
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 try:
     import streamlit as st
@@ -23,50 +27,246 @@ GER_STOP = {
 ENG_STOP = {
     "AND", "THE", "TO", "FOR", "OF", "IN", "AT", "ON", "BY", "MY", "PAY",
 }
-STOPWORDS = GER_STOP | ENG_STOP
+STOPWORDS = frozenset(GER_STOP | ENG_STOP)
+
+_PUNCT_RE = re.compile(r"[^\w\s]", re.UNICODE)
+
+_ARROW_STRING = pd.ArrowDtype(pa.string())
+
+_SNIFF_BYTES = 8192  # never hand csv.Sniffer more than this
+CHUNKED_READ_BYTES = 50_000_000  # larger uploads are parsed chunk by chunk
+_CHUNK_ROWS = 100_000
+
+
+def _iter_text(values: Iterable[Any]) -> Iterator[str]:
+    """Yield non-missing *values* as ``str``, lazily (no intermediate Series)."""
+    for x in values:
+        if isinstance(x, str):
+            yield x
+        elif not _is_missing(x):
+            yield str(x)
 
 @st.cache_data(show_spinner=False)
 def most_common(df: pd.DataFrame, col: str, k: int, min_len: int = 2) -> pd.DataFrame:
-    """Return *k* most frequent tokens in *df[col]* (after stop-word filtering)."""
-    def normalise(txt: Any) -> list[str]:
-        txt = re.sub(r"[^\w\s]", " ", str(txt).upper())
+    """Return *k* most frequent tokens in *df[col]* (after stop-word filtering).
+
+    Tokens are counted by one ``Counter`` fed from a chained token stream and
+    only the top *k* are selected, not the whole vocabulary sorted.
+    """
+    def normalise(txt: str) -> list[str]:
+        txt = _PUNCT_RE.sub(" ", txt.upper())
         return [t for t in txt.split() if t not in STOPWORDS and len(t) >= min_len]
 
-    bag: collections.Counter[str] = collections.Counter()
-    for tokens in df[col].dropna().map(normalise):
-        bag.update(tokens)
+    text = _iter_text(df[col].to_numpy(dtype=object, copy=False))
+    bag = collections.Counter(chain.from_iterable(map(normalise, text)))
+    words, freqs = _top_k(bag, k)
+    total = sum(bag.values())
 
-    if not bag:
+    if not total:
         return pd.DataFrame(columns=["keyword", "count", "share"])
 
-    total = sum(bag.values())
-    rows = [
-        {"keyword": w, "count": c, "share": c / total}
-        for w, c in bag.most_common(k)
+    return pd.DataFrame({
+        "keyword": list(words),
+        "count": list(freqs),
+        "share": [c / total for c in freqs],
+    })
+
+def _top_k(bag: collections.Counter, k: int) -> tuple[list[str], list[int]]:
+    """*k* most frequent entries of *bag*, ties in first-seen order.
+
+    ``np.partition`` finds the k-th largest count in O(V); only entries at
+    or above it are sorted.
+    """
+    counts = np.fromiter(bag.values(), dtype=np.int64, count=len(bag))
+    if 0 < k < len(counts):
+        kth = np.partition(counts, len(counts) - k)[len(counts) - k]
+        picked = np.flatnonzero(counts >= kth)
+    else:
+        picked = np.arange(len(counts))
+    top = picked[np.argsort(-counts[picked], kind="stable")][:k]
+    keys = list(bag)
+    return [keys[i] for i in top], counts[top].tolist()
+
+def _guess_sep(sample: str) -> str:
+    """Pick ``;`` or ``,`` if it alone occurs equally often on every line.
+
+    Commas in free text and decimal commas vary per row, so they never
+    outvote a consistent ``;``. Ambiguous samples go to ``csv.Sniffer``.
+    """
+    lines = [line for line in sample.splitlines() if line.strip()]
+    if len(lines) > 1:
+        lines = lines[:-1]  # the last line may be cut off by the sample size
+    steady = [
+        d for d in ";,"
+        if lines and lines[0].count(d) and len({line.count(d) for line in lines}) == 1
     ]
-    return pd.DataFrame(rows)
+    if len(steady) == 1:
+        return steady[0]
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=";,").delimiter or ";"
+    except csv.Error:
+        return ";"
+
+def csv_dialect(
+    file_buf: io.BytesIO, sep: str | None = None, decimal: str | None = None,
+) -> tuple[str, str]:
+    """Resolve *sep* / *decimal*, sniffing a sample only if *sep* is None."""
+    if sep is None:
+        file_buf.seek(0)
+        sample = file_buf.read(_SNIFF_BYTES).decode(errors="ignore")
+        sep = _guess_sep(sample)
+    file_buf.seek(0)
+    if decimal is None:
+        decimal = "," if sep == ";" else "."
+    return sep, decimal
+
+def _read_csv(file_buf: io.BytesIO, sep: str, decimal: str, **kwargs: Any) -> Any:
+    # C parser, not engine="pyarrow": that one rejects short rows and keeps
+    # duplicate / empty headers as-is instead of "A.1" / "Unnamed: n"
+    return pd.read_csv(file_buf, sep=sep, decimal=decimal, dtype_backend="pyarrow", **kwargs)
+
+def read_csv_chunked(
+    file_buf: io.BytesIO, sep: str, decimal: str,
+    progress: Callable[[float], Any] | None = None,
+    chunk_rows: int = _CHUNK_ROWS,
+) -> pd.DataFrame:
+    """Parse *file_buf* in *chunk_rows* slices into one Arrow-backed frame.
 
-def try_read_csv(file_buf: io.BytesIO) -> pd.DataFrame:
-    """Read German (`;` + decimal `,`) or default comma CSV automatically."""
+    Slices go through the same parser as :func:`try_read_csv` and are joined
+    as Arrow tables with permissive promotion (int + double, null + any), so
+    peak memory stays near the final table instead of ~2x the file. Slices
+    that cannot be joined (e.g. a code column turning alphanumeric) mean the
+    file is parsed again in one go, so inference sees every row.
+    *progress* is called with the fraction of bytes parsed after each slice.
+    """
+    size = file_buf.seek(0, io.SEEK_END) or 1
     file_buf.seek(0)
-    sample = file_buf.read(4096).decode(errors="ignore")
+    tables = []
+    for chunk in _read_csv(file_buf, sep, decimal, chunksize=chunk_rows):
+        tables.append(pa.Table.from_pandas(chunk, preserve_index=False))
+        if progress is not None:
+            progress(min(file_buf.tell() / size, 1.0))
+    try:
+        full = pa.concat_tables(tables, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        del tables  # don't hold the slices during the full re-read
+        file_buf.seek(0)
+        return _read_csv(file_buf, sep, decimal)
+    return full.to_pandas(types_mapper=pd.ArrowDtype)
+
+def try_read_csv(
+    file_buf: io.BytesIO, sep: str | None = None, decimal: str | None = None,
+) -> pd.DataFrame:
+    """Read German (`;` + decimal `,`) or default comma CSV automatically.
+
+    An explicit *sep* skips sniffing; *decimal* defaults to match *sep*.
+    Files over ``CHUNKED_READ_BYTES`` go through :func:`read_csv_chunked`.
+    """
+    sep, decimal = csv_dialect(file_buf, sep, decimal)
+    if file_buf.seek(0, io.SEEK_END) > CHUNKED_READ_BYTES:
+        return read_csv_chunked(file_buf, sep, decimal)
     file_buf.seek(0)
+    return _read_csv(file_buf, sep, decimal)
+
+def _is_arrow_string(series: pd.Series) -> bool:
+    """True if *series* holds Arrow-backed strings (``string[pyarrow]``)."""
+    return isinstance(series.dtype, pd.ArrowDtype) and series.dtype.kind == "U"
+
+def lower_array(series: pd.Series) -> pa.Array:
+    """Lower-cased Arrow string array of *series* (missing -> ``""``).
+
+    Build it once per column and pass it to :func:`keyword_mask` as *lower*
+    to skip the case-folding pass on every search.
+    """
+    if _is_arrow_string(series):
+        arr = pa.array(series.array)
+    else:
+        arr = pa.array(
+            [None if _is_missing(x) else str(x) for x in series.to_numpy(dtype=object)],
+            type=pa.string(),
+        )
+    return _lower(arr)
+
+def _lower(arr: pa.Array) -> pa.Array:
+    return pc.utf8_lower(arr).fill_null("")
+
+def _match_lower(lower: pa.Array, kw: str) -> np.ndarray:
+    return pc.match_substring(lower, kw.lower()).to_numpy(zero_copy_only=False)
+
+def keyword_mask(series: pd.Series, kw: str, lower: pa.Array | None = None) -> pd.Series:
+    """Case-insensitive plain-string match (Arrow ``match_substring`` if possible)."""
+    if lower is not None:
+        return pd.Series(_match_lower(lower, kw), index=series.index)
+    if not _is_arrow_string(series):
+        series = series.astype(str)
+    return series.str.contains(kw, case=False, na=False, regex=False)
 
-    dialect = csv.Sniffer().sniff(sample, delimiters=";,")
-    sep = dialect.delimiter or ";"
-    decimal = "," if sep == ";" else "."
-    return pd.read_csv(file_buf, sep=sep, decimal=decimal)
+def multi_keyword_mask(
+    series: pd.Series, kws: list[str], lower: pa.Array | None = None,
+) -> pd.Series:
+    """Case-insensitive match of *any* of *kws*.
 
-def keyword_mask(series: pd.Series, kw: str) -> pd.Series:
-    """Case-insensitive plain-string match."""
-    return series.astype(str).str.contains(kw, case=False, na=False, regex=False)
+    One Arrow ``match_substring`` pass per keyword over a :func:`lower_array`
+    of *series*, ORed. Pass *lower* to reuse an array built earlier.
+    """
+    if lower is None:
+        lower = lower_array(series)
+    hit = np.zeros(len(lower), dtype=bool)
+    for kw in kws:
+        if kw:
+            hit |= _match_lower(lower, kw)
+    return pd.Series(hit, index=series.index)
 
 def ensure_tag_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Add empty *Category* / *Subcategory* columns if missing.
+
+    On an Arrow-backed frame both are ``string[pyarrow]``, also when the CSV
+    already had them as numbers or all-empty (``null``) columns, so the
+    whole table stays columnar and :func:`tag_rows` can use ``pc.if_else``.
+    """
+    arrow = any(isinstance(dtype, pd.ArrowDtype) for dtype in df.dtypes)
     for col in ("Category", "Subcategory"):
         if col not in df.columns:
             df[col] = ""
+        if arrow and not _is_arrow_string(df[col]):
+            df[col] = df[col].astype(_ARROW_STRING)
+    return df
+
+def tag_rows(df: pd.DataFrame, mask: pd.Series | np.ndarray, cat: str, sub: str) -> pd.DataFrame:
+    """Set *Category* / *Subcategory* to *cat* / *sub* where *mask* is True.
+
+    Each column is rebuilt in one pass (``pc.if_else`` for Arrow strings,
+    ``np.where`` otherwise) instead of a label-aligned ``.loc`` write.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    for col, value in (("Category", cat), ("Subcategory", sub)):
+        series = df[col]
+        if _is_arrow_string(series):
+            tagged = _tag_array(pa.array(series.array), mask, value)
+            df[col] = pd.Series(pd.arrays.ArrowExtensionArray(tagged), index=df.index)
+        else:
+            df[col] = np.where(mask, value, series.to_numpy(dtype=object))
     return df
 
 def untagged_mask(df: pd.DataFrame) -> pd.Series:
     """True for rows whose *Category* is empty/NaN/whitespace."""
-    return df["Category"].fillna("").astype(str).str.strip() == ""
+    col = df["Category"]
+    if _is_arrow_string(col):
+        blank = _blank_array(pa.array(col.array))
+        return pd.Series(blank.to_numpy(zero_copy_only=False), index=col.index)
+    return pd.Series([_is_blank(x) for x in col.to_numpy(dtype=object)], index=col.index)
+
+def _tag_array(arr: pa.Array, mask: np.ndarray, value: str) -> pa.Array:
+    return pc.if_else(pa.array(mask), value, arr)
+
+def _blank_array(arr: pa.Array) -> pa.Array:
+    """True where *arr* is null or only whitespace."""
+    return pc.or_kleene(pc.is_null(arr), pc.equal(pc.utf8_trim_whitespace(arr), ""))
+
+def _is_blank(x: object) -> bool:
+    if isinstance(x, str):
+        return not x.strip()
+    return _is_missing(x)
+
+def _is_missing(x: object) -> bool:
+    return not isinstance(x, str) and bool(pd.isna(x))
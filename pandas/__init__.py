@@ -3,10 +3,23 @@ import csv
 import io
 from typing import Any, Iterable, List
 
+import numpy as np
+
+# below pyarrow's minimum, so pyarrow skips its pandas integration for the stub
+__version__ = "0.0.0"
+
+
+class ArrowDtype:
+    """Placeholder so ``isinstance(..., pd.ArrowDtype)`` checks work."""
+
+    def __init__(self, pyarrow_dtype=None):
+        self.pyarrow_dtype = pyarrow_dtype
+
 
 class Series:
-    def __init__(self, data: Iterable[Any]):
+    def __init__(self, data: Iterable[Any], index: Iterable[Any] | None = None):
         self.data = list(data)
+        self.index = list(range(len(self.data))) if index is None else list(index)
 
     # basic indexing
     def __getitem__(self, idx):
@@ -18,9 +31,16 @@ class Series:
     def __len__(self):
         return len(self.data)
 
+    @property
+    def dtype(self):
+        return object
+
     def tolist(self) -> List[Any]:
         return list(self.data)
 
+    def to_numpy(self, dtype=None, copy=False):
+        return np.array(self.data, dtype=dtype)
+
     def map(self, func):
         return Series([func(x) for x in self.data])
 
@@ -43,6 +63,14 @@ class Series:
             pat = str(kw)
             if not case:
                 pat = pat.lower()
+            data = self.series.data
+            if all(x is None or isinstance(x, str) for x in data):
+                # vectorised path: one np.char.find over a fixed-width str array
+                arr = np.array(["" if x is None else x for x in data], dtype=str)
+                if not case:
+                    arr = np.char.lower(arr)
+                hit = (np.char.find(arr, pat) >= 0).tolist()
+                return Series([na if x is None else h for x, h in zip(data, hit)], self.series.index)
             res = []
             for x in self.series.data:
                 if x is None:
@@ -54,9 +82,15 @@ class Series:
                 res.append(pat in s)
             return Series(res)
 
+        def _apply(self, func):
+            return Series([None if x is None else func(x) for x in self.series.data], self.series.index)
+
         def strip(self):
             return Series(["" if x is None else str(x).strip() for x in self.series.data])
 
+        def lower(self):
+            return self._apply(str.lower)
+
     @property
     def str(self):
         return Series._StrAccessor(self)
@@ -64,6 +98,9 @@ class Series:
     def __eq__(self, other):
         return Series([x == other for x in self.data])
 
+    def __or__(self, other):
+        return Series([a or b for a, b in zip(self.data, other.data)])
+
 
 class DataFrame:
     def __init__(self, data):
@@ -112,12 +149,18 @@ class DataFrame:
     def __setitem__(self, col, value):
         if isinstance(value, Series):
             value = value.data
+        elif isinstance(value, np.ndarray):
+            value = value.tolist()
         elif not isinstance(value, list):
             value = [value] * self.n_rows
         self._data[col] = list(value)
         if col not in self.columns:
             self.columns.append(col)
 
+    @property
+    def dtypes(self):
+        return Series([object] * len(self.columns), self.columns)
+
     @property
     def n_rows(self):
         if not self._data:
@@ -150,7 +193,7 @@ def DataFrame_from_rows(headers: list[str], rows: list[list[str]], decimal: str)
     return DataFrame(cols)
 
 
-def read_csv(file, sep: str = ',', decimal: str = '.') -> DataFrame:
+def read_csv(file, sep: str = ',', decimal: str = '.', **kwargs) -> DataFrame:
     if hasattr(file, 'read'):
         file.seek(0)
         text = file.read()
@@ -167,7 +210,11 @@ def read_csv(file, sep: str = ',', decimal: str = '.') -> DataFrame:
     return DataFrame_from_rows(headers, rows[1:], decimal)
 
 
+def isna(value: Any) -> bool:
+    return value is None or value != value
+
+
 def Series_from_list(lst: list[Any]) -> Series:
     return Series(lst)
 
-__all__ = ['DataFrame', 'Series', 'read_csv', 'Series_from_list']
+__all__ = ['ArrowDtype', 'DataFrame', 'Series', 'isna', 'read_csv', 'Series_from_list']
@@ -1,99 +1,142 @@
 # -----------------------------------------------------------
-#  Credit-card transaction tagger   •   Streamlit ≥ 1.35
+#  Credit-card transaction tagger   •   Streamlit ≥ 1.37
 # -----------------------------------------------------------
 """
 Run with
     streamlit run app.py
 """
 import io
-import re
-import csv
-import collections
+from typing import Callable, TypeVar
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import streamlit as st
 
+from helpers import (
+    CHUNKED_READ_BYTES,
+    csv_dialect,
+    ensure_tag_columns,
+    lower_array,
+    most_common,
+    multi_keyword_mask,
+    read_csv_chunked,
+    tag_rows,
+    try_read_csv,
+    untagged_mask,
+)
+
 # -----------------------------------------------------------
 #  Page config & heading
 # -----------------------------------------------------------
 st.set_page_config(page_title="Transaction Tagger", layout="wide")
 st.title("🔖 Tag your credit-card transaction s")
 
-# -----------------------------------------------------------
-#  Global stop-word set (extend as you like)
-# -----------------------------------------------------------
-GER_STOP = {
-    "UND", "FÜR", "FUR", "VON", "DER", "DIE", "MIT", "AUF", "IM", "AM",
-    "DEN", "EIN", "EINE", "DES", "IN", "AN",
-}
-ENG_STOP = {
-    "AND", "THE", "TO", "FOR", "OF", "IN", "AT", "ON", "BY", "MY", "PAY",
-}
-STOPWORDS = GER_STOP | ENG_STOP
+T = TypeVar("T")
 
 # -----------------------------------------------------------
-#  Helper: top-k keyword frequency  (must be **defined before** use!)
+#  Cached views of the current table
+#
+#  Views derived from ``df`` are memoised in *this* session's state, not in
+#  ``st.cache_data``: that cache is shared by all sessions on the server.
+#  ``_table_changed`` drops them whenever ``df`` changes (upload or tagging).
 # -----------------------------------------------------------
-@st.cache_data(show_spinner=False)
-def most_common(df: pd.DataFrame, col: str, k: int, min_len: int = 2) -> pd.DataFrame:
-    """Return a DataFrame with the k most frequent tokens in *df[col]*.
-
-    • Keeps digits (so "PAYPAL123" stays one token)
-    • Removes punctuation but keeps ÄÖÜß via ``\w``
-    • Drops stop-words and tokens shorter than *min_len*
-    """
-    def normalise(txt: str) -> list[str]:
-        txt = re.sub(r"[^\w\s]", " ", str(txt).upper())  # drop punctuation, upper-case
-        return [t for t in txt.split() if t not in STOPWORDS and len(t) >= min_len]
-
-    bag: collections.Counter[str] = collections.Counter()
-    for tokens in df[col].dropna().map(normalise):
-        bag.update(tokens)
-
-    if not bag:
-        return pd.DataFrame(columns=["keyword", "count", "share"])
-
-    total = sum(bag.values())
-    rows = [
-        {"keyword": w, "count": c, "share": c / total}
-        for w, c in bag.most_common(k)
-    ]
-    return pd.DataFrame(rows)
+def _memo(name: str, key: tuple, compute: Callable[[], T]) -> T:
+    """Session-local memo holding one entry per *name*; cleared by ``_table_changed``."""
+    views = st.session_state.setdefault("_views", {})
+    hit = views.get(name)
+    if hit is None or hit[0] != key:
+        hit = views[name] = (key, compute())
+    return hit[1]
+
+
+def _top_keywords(df: pd.DataFrame, col: str, k: int, min_len: int) -> pd.DataFrame:
+    return _memo("top_keywords", (col, k, min_len), lambda: most_common(df, col, k, min_len))
+
+
+def _search_mask(df: pd.DataFrame, col: str, kws: tuple[str, ...]) -> np.ndarray:
+    return _memo(
+        "search",
+        (col, kws),
+        lambda: multi_keyword_mask(df[col], list(kws), _lower_column(df, col)).to_numpy(dtype=bool),
+    )
 
-# -----------------------------------------------------------
-#  Other helpers
-# -----------------------------------------------------------
 
-def try_read_csv(file_buf: io.BytesIO) -> pd.DataFrame:
-    """Attempt German-style (``;`` & decimal ",") first, else pandas default."""
-    file_buf.seek(0)
-    sample = file_buf.read(4096).decode(errors="ignore")
-    file_buf.seek(0)
+def _lower_column(df: pd.DataFrame, col: str) -> pa.Array:
+    """Lower-cased *col*, kept in session state until the column can change."""
+    cache = st.session_state.setdefault("_lower_cache", {})
+    if col not in cache:
+        cache[col] = lower_array(df[col])
+    return cache[col]
 
-    dialect = csv.Sniffer().sniff(sample, delimiters=";,")
-    sep = dialect.delimiter or ";"
-    decimal = "," if sep == ";" else "."
-    return pd.read_csv(file_buf, sep=sep, decimal=decimal)
 
+def _serialize_csv(df: pd.DataFrame) -> bytes:
+    return _memo("csv", (), lambda: df.to_csv(index=False).encode())
 
-def keyword_mask(series: pd.Series, kw: str) -> pd.Series:
-    """Case-insensitive *plain-string* search (no regex)."""
-    return series.astype(str).str.contains(kw, case=False, na=False, regex=False)
 
+def _serialize_parquet(df: pd.DataFrame) -> bytes:
+    def write() -> bytes:
+        buf = io.BytesIO()
+        df.to_parquet(buf, engine="pyarrow", compression="zstd", index=False)
+        return buf.getvalue()
 
-def ensure_tag_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """Add empty *Category* / *Subcategory* columns if missing."""
-    for col in ("Category", "Subcategory"):
-        if col not in df.columns:
-            df[col] = ""
-    return df
+    return _memo("parquet", (), write)
+
+
+def _table_changed() -> None:
+    """Drop views of the old ``df`` and refresh the untagged-rows mask."""
+    st.session_state["_views"] = {}
+    st.session_state["_untagged_mask"] = untagged_mask(st.session_state["df"])
 
 # ===========================================================
 #  1  Upload CSV
 # ===========================================================
+def _dialect_param(name: str, label: str, choices: list[str]) -> str | None:
+    """Selectbox mirrored to ``?name=…`` so a chosen CSV dialect is shareable."""
+    current = st.query_params.get(name, "auto")
+    if current != "auto" and len(current) != 1:
+        current = "auto"  # the parsers only take single characters, e.g. not ?sep=;;
+    if current not in choices:
+        choices = [*choices, current]  # e.g. ?sep=| from a shared link
+    value = st.selectbox(label, choices, index=choices.index(current), key=f"csv_{name}")
+    if value == "auto":
+        st.query_params.pop(name, None)
+        return None
+    st.query_params[name] = value
+    return value
+
+with st.sidebar:
+    with st.expander("⚙️ CSV format", expanded=False):
+        sep = _dialect_param("sep", "Delimiter", ["auto", ";", ","])
+        decimal = _dialect_param("decimal", "Decimal mark", ["auto", ",", "."])
+
+def _drops_tags(file_id: str) -> bool:
+    """True if re-reading the current file (new CSV format) would lose tags."""
+    last = st.session_state.get("_upload_id")
+    return last is not None and last[0] == file_id and not st.session_state["_untagged_mask"].all()
+
 uploaded = st.file_uploader("⬆️ Upload CSV", type="csv")
-if uploaded is not None:
-    df = ensure_tag_columns(try_read_csv(uploaded))
+upload_id = None if uploaded is None else (uploaded.file_id, sep, decimal)
+reparse = uploaded is not None and st.session_state.get("_upload_id") != upload_id
+if reparse and _drops_tags(uploaded.file_id):
+    st.warning(
+        "Changing the CSV format re-reads the file and drops all tags. "
+        "Download the tagged table first, or switch the format back."
+    )
+    reparse = st.button("Re-read file and drop tags")
+if reparse:
+    if uploaded.size > CHUNKED_READ_BYTES:
+        bar = st.progress(0.0, text="Parsing large CSV …")
+        df = read_csv_chunked(uploaded, *csv_dialect(uploaded, sep, decimal), progress=bar.progress)
+        bar.empty()
+    else:
+        df = try_read_csv(uploaded, sep=sep, decimal=decimal)
+    df = ensure_tag_columns(df)
     st.session_state["df"] = df
+    st.session_state["_upload_id"] = upload_id
+    st.session_state.pop("mask", None)  # stale search from the previous file
+    st.session_state["_lower_cache"] = {}
+    _table_changed()
     st.success(f"Loaded {len(df):,} rows.")
 
 # guard-rail
@@ -108,13 +151,18 @@ df = st.session_state.df
 # ===========================================================
 with st.sidebar:
     st.header("🔍 Filter")
-    text_cols = [c for c in df.columns if df[c].dtype == object or df[c].dtype.name == "string"]
+    text_cols = [c for c in df.columns if pd.api.types.is_string_dtype(df[c].dtype)]
     search_col = st.selectbox("Column to search", text_cols, key="search_col")
-    keyword = st.text_input("Keyword (case-insensitive)", placeholder="itunes", key="search_kw")
+    keyword = st.text_input("Keyword(s), comma-separated (case-insensitive)", placeholder="itunes, netflix", key="search_kw")
     if st.button("Search / Refresh", use_container_width=True):
-        st.session_state["mask"] = keyword_mask(df[search_col], keyword) if keyword else pd.Series([True] * len(df))
-
-mask = st.session_state.get("mask", pd.Series([True] * len(df)))
+        kws = [kw.strip() for kw in keyword.split(",") if kw.strip()]
+        st.session_state["mask"] = (
+            _search_mask(df, search_col, tuple(kws))
+            if kws else np.ones(len(df), dtype=bool)
+        )
+
+# default view: rows that still need a tag
+mask = st.session_state.get("mask", st.session_state.get("_untagged_mask"))
 hits = df[mask]
 
 st.write(f"### {mask.sum():,} matching row(s)")
@@ -123,38 +171,67 @@ st.dataframe(hits, height=400, use_container_width=True)
 # ===========================================================
 #  3  Tagging
 # ===========================================================
-st.markdown("#### Apply tag to **all** filtered rows")
-c1, c2, c3 = st.columns([2, 3, 1])
-with c1:
-    cat = st.text_input("Category", placeholder="Private", key="tag_cat")
-with c2:
-    sub = st.text_input("Sub-category", placeholder="entertainment", key="tag_sub")
-with c3:
-    if st.button("Tag rows ✅", type="primary", use_container_width=True) and cat and sub:
-        df.loc[mask, "Category"] = cat.strip()
-        df.loc[mask, "Subcategory"] = sub.strip()
-        st.session_state["df"] = df  # persist change
-        st.success(f"Tagged {mask.sum():,} row(s) as {cat}/{sub}")
+# Fragments: typing a tag, moving a slider or downloading only reruns
+# its own section. Tagging changes ``df``, so it reruns the whole app.
+@st.fragment
+def _tag_fragment(df: pd.DataFrame, mask: pd.Series | np.ndarray) -> None:
+    st.markdown("#### Apply tag to **all** filtered rows")
+    c1, c2, c3 = st.columns([2, 3, 1])
+    with c1:
+        cat = st.text_input("Category", placeholder="Private", key="tag_cat")
+    with c2:
+        sub = st.text_input("Sub-category", placeholder="entertainment", key="tag_sub")
+    with c3:
+        if st.button("Tag rows ✅", type="primary", use_container_width=True) and cat and sub:
+            df = tag_rows(df, mask, cat.strip(), sub.strip())
+            st.session_state["df"] = df  # persist change
+            _table_changed()
+            for col in ("Category", "Subcategory"):  # the only columns tagging touches
+                st.session_state["_lower_cache"].pop(col, None)
+            st.session_state["_tag_msg"] = f"Tagged {mask.sum():,} row(s) as {cat}/{sub}"
+            st.rerun(scope="app")
+    if msg := st.session_state.pop("_tag_msg", None):
+        st.success(msg)
+
+_tag_fragment(df, mask)
 
 # ===========================================================
 #  4  Keyword discovery panel
 # ===========================================================
-with st.expander("🕵️‍♀️ Discover top keywords", expanded=False):
-    ana_col = st.selectbox("Column to analyse", text_cols, key="kw_col")
-    top_k = st.slider("Show top … keywords", 10, 100, 30, 10, key="kw_topk")
-    min_len = st.slider("Minimum token length", 1, 5, 2, key="kw_minlen")
+@st.fragment
+def _keyword_fragment(df: pd.DataFrame, text_cols: list[str]) -> None:
+    with st.expander("🕵️‍♀️ Discover top keywords", expanded=False):
+        ana_col = st.selectbox("Column to analyse", text_cols, key="kw_col")
+        top_k = st.slider("Show top … keywords", 10, 100, 30, 10, key="kw_topk")
+        min_len = st.slider("Minimum token length", 1, 5, 2, key="kw_minlen")
+
+        freq_df = _top_keywords(df, ana_col, top_k, min_len)
+        st.dataframe(freq_df, use_container_width=True)
 
-    freq_df = most_common(df, ana_col, top_k, min_len)
-    st.dataframe(freq_df, use_container_width=True)
+_keyword_fragment(df, text_cols)
 
 # ===========================================================
 #  5  Download
 # ===========================================================
+@st.fragment
+def _download_fragment(df: pd.DataFrame) -> None:
+    d1, d2 = st.columns(2)
+    with d1:
+        st.download_button(
+            label="📥 Download tagged CSV",
+            data=_serialize_csv(df),
+            file_name="transactions_tagged.csv",
+            mime="text/csv",
+            use_container_width=True,
+        )
+    with d2:
+        st.download_button(
+            label="📦 Download tagged Parquet",
+            data=_serialize_parquet(df),
+            file_name="transactions_tagged.parquet",
+            mime="application/vnd.apache.parquet",
+            use_container_width=True,
+        )
+
 st.divider()
-st.download_button(
-    label="📥 Download tagged CSV",
-    data=df.to_csv(index=False).encode(),
-    file_name="transactions_tagged.csv",
-    mime="text/csv",
-    use_container_width=True,
-)
+_download_fragment(df)
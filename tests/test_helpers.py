@@ -1,20 +1,53 @@
 import io
+import pathlib
+import subprocess
 import sys
+import textwrap
 import types
 
+import numpy as np
 import pandas as pd
+import pytest
 
 # Import helpers without requiring streamlit runtime
 sys.modules.setdefault('streamlit', types.SimpleNamespace(cache_data=lambda **k: (lambda f: f)))
 
+# pyarrow notices the pandas stub and warns that it won't integrate with it
+pytestmark = pytest.mark.filterwarnings("ignore:pyarrow requires pandas")
+
 from helpers import (
     most_common,
     try_read_csv,
     keyword_mask,
+    lower_array,
+    multi_keyword_mask,
     ensure_tag_columns,
+    tag_rows,
     untagged_mask,
 )
 
+# The stub above shadows pandas for this process, so checks that depend on
+# the real parser run in a child interpreter with the repo on sys.path.
+REPO = pathlib.Path(__file__).resolve().parents[1]
+REAL_PANDAS_PRELUDE = f"""
+import io, sys, types
+sys.modules.setdefault("streamlit", types.SimpleNamespace(cache_data=lambda **k: (lambda f: f)))
+try:
+    import pandas as pd
+except ModuleNotFoundError:
+    sys.exit(77)
+sys.path.append({str(REPO)!r})
+import helpers
+"""
+
+def run_with_real_pandas(tmp_path, code: str) -> None:
+    script = tmp_path / "check.py"
+    script.write_text(REAL_PANDAS_PRELUDE + textwrap.dedent(code))
+    proc = subprocess.run([sys.executable, str(script)], cwd=tmp_path, capture_output=True, text=True)
+    if proc.returncode == 77:
+        pytest.skip("pandas is not installed")
+    assert proc.returncode == 0, proc.stderr
+
 def test_try_read_csv_semicolon():
     data = "A;B\n1,23;4,56\n7,89;0,12"
     df = try_read_csv(io.BytesIO(data.encode()))
@@ -28,24 +61,138 @@ def test_try_read_csv_comma():
     assert df["A"].tolist() == [1.5, 3.0]
     assert df["B"].tolist() == [2.5, 4.0]
 
+def test_try_read_csv_bank_export_with_commas_in_text():
+    data = "Verwendungszweck;Betrag\n" + "Kartenzahlung REWE, Berlin, DE, Visa;-0,99\n" * 6
+    df = try_read_csv(io.BytesIO(data.encode()))
+    assert list(df.columns) == ["Verwendungszweck", "Betrag"]
+    assert df["Betrag"].tolist() == [-0.99] * 6
+
+def test_try_read_csv_explicit_dialect():
+    data = "A;B\n1.5;x\n3.0;y"
+    df = try_read_csv(io.BytesIO(data.encode()), sep=";", decimal=".")
+    assert list(df.columns) == ["A", "B"]
+    assert df["A"].tolist() == [1.5, 3.0]
+
+def test_read_csv_chunked_promotes_like_single_read_real_pandas(tmp_path):
+    run_with_real_pandas(tmp_path, """
+        rows = "".join(
+            f"2024-01-{i % 28 + 1:02d};SHOP {i};{i if i < 30_000 else f'{i},5'};{'x' if i > 50_000 else ''}\\n"
+            for i in range(60_000)
+        )
+        data = ("Date;Text;Amount;Note\\n" + rows).encode()
+        seen = []
+        df = helpers.read_csv_chunked(io.BytesIO(data), ";", ",", seen.append, chunk_rows=10_000)
+        ref = helpers.try_read_csv(io.BytesIO(data))
+        assert df.dtypes.to_dict() == ref.dtypes.to_dict(), df.dtypes
+        assert str(df["Amount"].dtype) == "double[pyarrow]" and df.equals(ref)
+        assert len(seen) == 6 and seen == sorted(seen), seen
+        assert seen[0] < 0.5 and seen[-1] == 1.0
+    """)
+
+def test_read_csv_chunked_falls_back_on_type_drift_real_pandas(tmp_path):
+    run_with_real_pandas(tmp_path, """
+        data = ("Code;N\\n" + "1;1\\n" * 2000 + "A7;2\\n").encode()
+        df = helpers.read_csv_chunked(io.BytesIO(data), ";", ".", chunk_rows=500)
+        assert str(df["Code"].dtype) == "string[pyarrow]"
+        assert len(df) == 2001 and df["Code"].iloc[-1] == "A7"
+        assert df.equals(helpers.try_read_csv(io.BytesIO(data)))
+    """)
+
+def test_try_read_csv_real_pandas_short_rows_and_headers(tmp_path):
+    run_with_real_pandas(tmp_path, """
+        df = helpers.try_read_csv(io.BytesIO(b"A;A;;C\\n1;2;x;3,5\\n4;5\\n"))
+        assert list(df.columns) == ["A", "A.1", "Unnamed: 2", "C"], list(df.columns)
+        assert df["C"][0] == 3.5 and df["C"].isna().tolist() == [False, True]
+        assert str(df["Unnamed: 2"].dtype) == "string[pyarrow]"
+    """)
+
 def test_keyword_mask_case_insensitive():
     series = pd.Series(["Apple", "banana", None])
     result = keyword_mask(series, "apple")
     assert result.tolist() == [True, False, False]
 
+def test_multi_keyword_mask():
+    series = pd.Series(["Apple Store", "banana", None, "NETFLIX.COM", "kiwi"])
+    result = multi_keyword_mask(series, ["apple", "Netflix", ""])
+    assert result.tolist() == [True, False, False, True, False]
+    assert multi_keyword_mask(series, ["none", "nan"]).tolist() == [False, True, False, False, False]
+
+def test_keyword_mask_with_lower_array():
+    series = pd.Series(["Apple", "PINEAPPLE", None, "banana"])
+    lower = lower_array(series)
+    assert lower.to_pylist() == ["apple", "pineapple", "", "banana"]
+    assert keyword_mask(series, "APPLE", lower).tolist() == [True, True, False, False]
+    assert multi_keyword_mask(series, ["pine", "nan"], lower).tolist() == [False, True, False, True]
+    assert multi_keyword_mask(series, [], lower).tolist() == [False] * 4
+
 def test_ensure_tag_columns_adds_missing():
     df = pd.DataFrame({"A": [1]})
     df = ensure_tag_columns(df)
     assert "Category" in df.columns and "Subcategory" in df.columns
     assert df.loc[0, "Category"] == ""
 
+def test_tag_rows():
+    df = ensure_tag_columns(pd.DataFrame({"desc": ["a", "b", "c"]}))
+    df = tag_rows(df, pd.Series([True, False, True]), "Private", "food")
+    assert df["Category"].tolist() == ["Private", "", "Private"]
+    assert df["Subcategory"].tolist() == ["food", "", "food"]
+
 def test_untagged_mask():
     df = pd.DataFrame({"Category": ["", "x", " ", None]})
     mask = untagged_mask(df)
     assert mask.tolist() == [True, False, True, True]
 
+def test_arrow_array_helpers():
+    import pyarrow as pa
+    from helpers import _blank_array, _lower, _tag_array
+
+    arr = pa.array(["Apple", None, " ", "x"])
+    assert _lower(arr).to_pylist() == ["apple", "", " ", "x"]
+    assert _blank_array(arr).to_pylist() == [False, True, True, False]
+    tagged = _tag_array(arr, np.array([True, True, False, False]), "Private")
+    assert tagged.type == pa.string()
+    assert tagged.to_pylist() == ["Private", "Private", " ", "x"]
+
+def test_arrow_frame_real_pandas(tmp_path):
+    run_with_real_pandas(tmp_path, """
+        df = helpers.try_read_csv(io.BytesIO(b"Text;Amount\\nApple Store;1,5\\nNETFLIX;2\\n"))
+        df = helpers.ensure_tag_columns(df)
+        assert str(df["Category"].dtype) == "string[pyarrow]"
+        assert helpers.untagged_mask(df).tolist() == [True, True]
+        df = helpers.tag_rows(df, [True, False], "Private", "apps")
+        assert str(df["Category"].dtype) == "string[pyarrow]"
+        assert df["Subcategory"].tolist() == ["apps", ""]
+        assert helpers.untagged_mask(df).tolist() == [False, True]
+        assert helpers.lower_array(df["Text"]).to_pylist() == ["apple store", "netflix"]
+    """)
+
+def test_tag_columns_from_csv_become_arrow_strings_real_pandas(tmp_path):
+    run_with_real_pandas(tmp_path, """
+        df = helpers.try_read_csv(io.BytesIO(b"Text;Category;Subcategory\\na;1;\\nb;;\\n"))
+        df = helpers.ensure_tag_columns(df)
+        assert str(df["Category"].dtype) == str(df["Subcategory"].dtype) == "string[pyarrow]"
+        assert helpers.untagged_mask(df).tolist() == [False, True]
+        df = helpers.tag_rows(df, [False, True], "Private", "food")
+        assert df["Category"].tolist() == ["1", "Private"]
+        df.to_parquet(io.BytesIO(), engine="pyarrow", index=False)
+    """)
+
 def test_most_common_basic():
     df = pd.DataFrame({"desc": ["the cat", "cat and dog", "dog"]})
     result = most_common(df, "desc", 2)
     assert result.loc[0, "keyword"] in {"CAT", "DOG"}
     assert set(result["count"]) == {2}
+
+def test_most_common_top_k_matches_counter():
+    import collections
+
+    words = "aa bb cc dd ee aa bb cc aa ff gg hh bb".split()
+    df = pd.DataFrame({"desc": [" ".join(words)]})
+    expected = collections.Counter(w.upper() for w in words).most_common(4)
+    result = most_common(df, "desc", 4)
+    assert list(zip(result["keyword"], result["count"])) == expected
+
+def test_try_read_csv_single_column_defaults_to_semicolon():
+    df = try_read_csv(io.BytesIO(b"A\n1\n2"))
+    assert list(df.columns) == ["A"]
+    assert df["A"].tolist() == [1.0, 2.0]